@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from typing import List, Dict
 import json
 
 from app import crud, schemas, models
-from app.database import get_db
-from app.utils.mailer import send_pin_email
-# from app.core.config import settings
+from app.database import SessionLocal, get_db
+from app.utils.mailer import send_pin_email, send_pin_emails
+from app.utils.bulk_import import parse_bulk_rows
+from app.core.config import settings
 
 # Clase para gestionar conexiones WebSocket
 class ConnectionManager:
@@ -43,20 +45,17 @@ router = APIRouter()
 
 @router.post("/use", response_model=schemas.Locker)
 async def use_locker(locker_use: schemas.LockerUse, db: Session = Depends(get_db)):
-    # Encontrar un locker disponible
-    available_locker = crud.get_available_locker(db)
-    if not available_locker:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
-                           detail="No hay lockers disponibles")
-    
     # Verificar si el usuario existe, crear si no
     user = crud.get_user_by_email(db, locker_use.email)
     if not user:
         user = crud.create_user(db, locker_use.email)
     
-    # Generar y asignar PIN
-    pin = crud.generate_pin()
-    user = crud.assign_pin_to_user(db, user.id, pin)
+    # Encontrar un locker disponible; queda bloqueado hasta asignarlo, por eso
+    # no debe haber ningún commit entre esta consulta y assign_locker_to_user
+    available_locker = crud.get_available_locker(db)
+    if not available_locker:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
+                           detail="No hay lockers disponibles")
     
     # Mostrar información para depuración
     print(f"Asignando locker {available_locker.id} al usuario {user.id} con email {user.email}")
@@ -64,6 +63,10 @@ async def use_locker(locker_use: schemas.LockerUse, db: Session = Depends(get_db
     # Asignar locker al usuario (ahora cambia a estado "ocupado" directamente)
     locker = crud.assign_locker_to_user(db, available_locker.id, user.id)
     
+    # Generar y asignar PIN
+    pin = crud.generate_pin()
+    user = crud.assign_pin_to_user(db, user.id, pin)
+    
     # Verificar que la asignación se hizo correctamente
     print(f"Resultado: locker_id={locker.id}, assigned_user_id={locker.assigned_user_id}, status={locker.status}")
     
@@ -249,6 +252,187 @@ def get_locker_alerts(locker_id: int, skip: int = 0, limit: int = 100, db: Sessi
     alerts = crud.get_locker_alerts(db, locker_id, skip, limit)
     return alerts
 
+async def _read_bulk_rows(request: Request, key: str, column: str, schema):
+    """Lee el cuerpo (JSON, CSV o NDJSON) y valida cada fila con el schema indicado"""
+    body = await request.body()
+    try:
+        rows = parse_bulk_rows(body, request.headers.get("content-type", ""), key, column)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(rows) > settings.BULK_MAX_COUNT:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                           detail=f"Máximo {settings.BULK_MAX_COUNT} filas por petición")
+
+    items = []
+    for row_number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                               detail=f"Fila {row_number}: se esperaba un objeto")
+        try:
+            items.append(schema(**row))
+        except ValidationError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                               detail=f"Fila {row_number}: {e.errors()}")
+    return items
+
+def _require_selection(selection: schemas.LockerBulkSelection):
+    # Evitar que una petición vacía afecte a todos los lockers
+    if selection.locker_ids is None and selection.status is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                           detail="Debe indicar locker_ids o status")
+
+@router.post("/lockers/bulk", response_model=schemas.BulkResult, status_code=status.HTTP_201_CREATED)
+async def bulk_create_lockers(request: Request,
+                              count: int = Query(0, ge=0, le=settings.BULK_MAX_COUNT),
+                              db: Session = Depends(get_db)):
+    """
+    Crea lockers en bloque.
+    - count=N (query): crea N lockers con el estado por defecto
+    - Cuerpo JSON ({"lockers": [...]} o lista), CSV (columna "status") o NDJSON
+    Los lockers nuevos no tienen usuario, así que solo se admite "disponible".
+    """
+    lockers = await _read_bulk_rows(request, "lockers", "status", schemas.LockerBulkCreateRow)
+    statuses = [locker.status for locker in lockers]
+    statuses.extend([schemas.LockerBulkCreateRow().status] * count)
+    if len(statuses) > settings.BULK_MAX_COUNT:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                           detail=f"Máximo {settings.BULK_MAX_COUNT} lockers por petición")
+
+    created_ids = crud.bulk_create_lockers(db, statuses)
+    print(f"Creados {len(created_ids)} lockers en bloque")
+    return schemas.BulkResult(requested=len(statuses), affected=len(created_ids), ids=created_ids)
+
+@router.post("/users/bulk", response_model=schemas.BulkResult, status_code=status.HTTP_201_CREATED)
+async def bulk_create_users(request: Request, db: Session = Depends(get_db)):
+    """
+    Pre-registra usuarios en bloque. Cuerpo JSON ({"users": [...]} o lista),
+    CSV (columna "email") o NDJSON. Los emails ya registrados se ignoran.
+    """
+    users = await _read_bulk_rows(request, "users", "email", schemas.LockerUserCreate)
+    # Eliminar duplicados conservando el orden
+    emails = list(dict.fromkeys(user.email for user in users))
+
+    created_ids = crud.bulk_create_users(db, emails)
+    print(f"Registrados {len(created_ids)} usuarios nuevos de {len(emails)} recibidos")
+    return schemas.BulkResult(requested=len(emails), affected=len(created_ids), ids=created_ids)
+
+@router.post("/lockers/bulk/release", response_model=schemas.BulkResult)
+async def bulk_release_lockers(selection: schemas.LockerBulkSelection, db: Session = Depends(get_db)):
+    """Libera todos los lockers seleccionados por ids y/o estado actual"""
+    _require_selection(selection)
+    released_ids = crud.bulk_release_lockers(db, selection.locker_ids, selection.status)
+    print(f"Liberados {len(released_ids)} lockers en bloque")
+
+    for locker_id in released_ids:
+        release_event = {
+            "event": "locker_released",
+            "locker_id": locker_id
+        }
+        await manager.broadcast(locker_id, json.dumps(release_event))
+
+    requested = len(selection.locker_ids) if selection.locker_ids is not None else len(released_ids)
+    return schemas.BulkResult(requested=requested, affected=len(released_ids), ids=released_ids)
+
+@router.post("/lockers/bulk/status", response_model=schemas.BulkResult)
+async def bulk_update_locker_status(change: schemas.LockerBulkStatusChange, db: Session = Depends(get_db)):
+    """
+    Cambia el estado de los lockers asignados seleccionados por ids y/o estado actual.
+    No modifica la asignación de usuario; para liberar usar /lockers/bulk/release.
+    """
+    _require_selection(change)
+    updated_ids = crud.bulk_update_locker_status(db, change.new_status, change.locker_ids, change.status)
+    print(f"Estado '{change.new_status}' aplicado a {len(updated_ids)} lockers")
+
+    for locker_id in updated_ids:
+        status_event = {
+            "event": "locker_status_changed",
+            "locker_id": locker_id,
+            "status": change.new_status
+        }
+        await manager.broadcast(locker_id, json.dumps(status_event))
+
+    requested = len(change.locker_ids) if change.locker_ids is not None else len(updated_ids)
+    return schemas.BulkResult(requested=requested, affected=len(updated_ids), ids=updated_ids)
+
+def _send_batch_pin_emails(assignments: List[Dict]):
+    """Envía los PIN de un lote fuera de la petición y registra alertas por los fallos"""
+    locker_by_email = {a["email"]: a["locker_id"] for a in assignments}
+    try:
+        failures = send_pin_emails([(a["email"], a["pin"]) for a in assignments])
+    except Exception as e:
+        # Fallo de conexión o login: no se envió ningún correo del lote
+        failures = [(a["email"], str(e)) for a in assignments]
+
+    if not failures:
+        return
+    db = SessionLocal()
+    try:
+        for email, error in failures:
+            error_message = f"Error al enviar PIN a {email}: {error}"
+            print(error_message)
+            crud.create_locker_alert(db, locker_by_email[email], error_message)
+    finally:
+        db.close()
+
+@router.post("/use/batch", response_model=List[schemas.CheckoutAssignment])
+async def batch_use_lockers(checkout: schemas.BatchCheckout, background_tasks: BackgroundTasks,
+                            db: Session = Depends(get_db)):
+    """
+    Versión en bloque de /use: asigna N lockers a N emails en una sola transacción.
+    Si no hay lockers suficientes o algún email ya tiene locker no se asigna
+    ninguno. Los PIN se envían por correo en segundo plano después de responder.
+    """
+    emails = [str(email) for email in checkout.emails]
+    if not emails:
+        return []
+    if len(set(emails)) != len(emails):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                           detail="La lista contiene emails repetidos")
+
+    try:
+        assignments = crud.batch_assign_lockers(db, emails)
+    except crud.LockersUnavailableError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                           detail="No hay lockers disponibles suficientes")
+    except crud.UsersWithLockerError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                           detail={"message": "Estos usuarios ya tienen un locker asignado",
+                                   "emails": e.emails})
+    print(f"Asignados {len(assignments)} lockers en bloque")
+
+    # Los efectos externos se hacen después del commit, igual que en /use
+    background_tasks.add_task(_send_batch_pin_emails, assignments)
+
+    for assignment in assignments:
+        locker_id = assignment["locker_id"]
+        event_data = {
+            "event": "locker_assigned",
+            "locker_id": locker_id,
+            "status": "ocupado",
+            "user_id": assignment["user_id"],
+            "email": assignment["email"]
+        }
+        await manager.broadcast(locker_id, json.dumps(event_data))
+
+        ws_command = {
+            "cmd": "actuate",
+            "open": True,
+            "mode": "store",
+            "tipo": "use"
+        }
+        await manager.broadcast(locker_id, json.dumps(ws_command))
+
+    crud.bulk_create_locker_history(
+        db, [a["locker_id"] for a in assignments], "comando_websocket_enviado"
+    )
+
+    return [
+        schemas.CheckoutAssignment(
+            locker_id=a["locker_id"], user_id=a["user_id"], email=a["email"]
+        )
+        for a in assignments
+    ]
+
 @router.websocket("/ws/locker/{locker_id}")
 async def websocket_locker(websocket: WebSocket, locker_id: int):
     """
@@ -12,6 +12,10 @@ class Settings(BaseSettings):
     EMAIL_HOST_PASSWORD: str = "jkpy sfmr qupo uuer"
       # ESP32
     ESP32_IP: str = "192.168.100.6"
+    # Operaciones masivas: filas por sentencia INSERT/UPDATE
+    BULK_CHUNK_SIZE: int = 1000
+    # Máximo de filas, ids o emails por operación masiva (incluye ?count=N)
+    BULK_MAX_COUNT: int = 10000
     
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -1,12 +1,20 @@
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
 import random
 import string
 from datetime import datetime, timedelta
 from app import models
+from app.core.config import settings
 # from app.utils.mailer import send_pin_email
 
 def get_available_locker(db: Session):
-    return db.query(models.Locker).filter(models.Locker.status == "disponible").first()
+    # Bloquea el locker hasta el siguiente commit; SKIP LOCKED salta los que
+    # otra transacción (otro /use o /use/batch) ya tiene reservados
+    return db.query(models.Locker).filter(
+        models.Locker.status == "disponible"
+    ).with_for_update(skip_locked=True).first()
 
 def get_locker(db: Session, locker_id: int):
     return db.query(models.Locker).filter(models.Locker.id == locker_id).first()
@@ -139,4 +147,236 @@ def is_pin_valid(db: Session, pin: str) -> bool:
     current_time = datetime.utcnow()
     
     # Comparar fechas sin timezone para evitar el error
-    return current_time <= expiration_time
\ No newline at end of file
+    return current_time <= expiration_time
+
+# ---------------------------------------------------------------------------
+# Operaciones masivas
+# Todas trabajan con sentencias por conjuntos (INSERT multi-fila / UPDATE ... WHERE)
+# en bloques de settings.BULK_CHUNK_SIZE y hacen un único commit al final.
+# ---------------------------------------------------------------------------
+
+class LockersUnavailableError(Exception):
+    """No hay lockers disponibles suficientes para todo el lote"""
+
+class UsersWithLockerError(Exception):
+    """Algunos emails del lote ya tienen un locker asignado"""
+    def __init__(self, emails: List[str]):
+        super().__init__(f"Usuarios con locker asignado: {', '.join(emails)}")
+        self.emails = emails
+
+def _chunks(items: list, size: Optional[int] = None):
+    size = size or settings.BULK_CHUNK_SIZE
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _locker_selection(locker_ids: Optional[List[int]], status: Optional[str]):
+    conditions = []
+    if locker_ids is not None:
+        conditions.append(models.Locker.id.in_(locker_ids))
+    if status is not None:
+        conditions.append(models.Locker.status == status)
+    return conditions
+
+def _bulk_create_history(db: Session, locker_ids: List[int], action: str):
+    for chunk in _chunks(locker_ids):
+        db.execute(insert(models.LockerHistory).values(
+            [{"locker_id": locker_id, "action": action} for locker_id in chunk]
+        ))
+
+def bulk_create_lockers(db: Session, statuses: List[str]) -> List[int]:
+    """Crea un locker por cada estado recibido y devuelve los ids generados"""
+    now = datetime.utcnow()
+    created_ids = []
+    for chunk in _chunks(statuses):
+        result = db.execute(
+            insert(models.Locker)
+            .values([{"status": status, "updated_at": now} for status in chunk])
+            .returning(models.Locker.id)
+        )
+        created_ids.extend(result.scalars().all())
+    db.commit()
+    return created_ids
+
+def bulk_create_users(db: Session, emails: List[str]) -> List[int]:
+    """Registra usuarios por email; los emails ya existentes se ignoran"""
+    created_ids = []
+    for chunk in _chunks(emails):
+        result = db.execute(
+            pg_insert(models.LockerUser)
+            .values([{"email": email} for email in chunk])
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(models.LockerUser.id)
+        )
+        created_ids.extend(result.scalars().all())
+    db.commit()
+    return created_ids
+
+def bulk_release_lockers(db: Session, locker_ids: Optional[List[int]] = None,
+                         status: Optional[str] = None) -> List[int]:
+    """Equivalente a release_locker para muchos lockers en un solo commit"""
+    conditions = _locker_selection(locker_ids, status)
+
+    # Bloquear las filas seleccionadas y liberar en una sola sentencia,
+    # devolviendo el usuario que tenía asignado cada locker antes del UPDATE
+    targets = (
+        select(models.Locker.id, models.Locker.assigned_user_id)
+        .where(*conditions, models.Locker.status != "disponible")
+        .with_for_update()
+        .cte("targets")
+    )
+    result = db.execute(
+        update(models.Locker)
+        .where(models.Locker.id == targets.c.id)
+        .values(status="disponible", assigned_user_id=None, updated_at=datetime.utcnow())
+        .returning(models.Locker.id, targets.c.assigned_user_id)
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    released_ids = [locker_id for locker_id, _ in rows]
+    user_ids = [user_id for _, user_id in rows if user_id is not None]
+
+    # Limpiar el PIN solo de los usuarios de los lockers realmente liberados
+    for chunk in _chunks(user_ids):
+        db.execute(
+            update(models.LockerUser)
+            .where(models.LockerUser.id.in_(chunk))
+            .values(pin=None, pin_created_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    _bulk_create_history(db, released_ids, "locker_liberado_masivo")
+    db.commit()
+    return released_ids
+
+def bulk_update_locker_status(db: Session, new_status: str,
+                              locker_ids: Optional[List[int]] = None,
+                              status: Optional[str] = None) -> List[int]:
+    """
+    Cambia el estado de los lockers seleccionados sin tocar la asignación.
+    Solo afecta a lockers con usuario asignado: un locker libre debe seguir
+    "disponible" y liberar se hace con bulk_release_lockers.
+    """
+    conditions = _locker_selection(locker_ids, status)
+    result = db.execute(
+        update(models.Locker)
+        .where(*conditions, models.Locker.assigned_user_id.isnot(None))
+        .values(status=new_status, updated_at=datetime.utcnow())
+        .returning(models.Locker.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated_ids = result.scalars().all()
+
+    _bulk_create_history(db, updated_ids, "estado_actualizado_masivo")
+    db.commit()
+    return updated_ids
+
+def bulk_create_locker_history(db: Session, locker_ids: List[int], action: str):
+    _bulk_create_history(db, locker_ids, action)
+    db.commit()
+
+def generate_unique_pins(db: Session, count: int) -> List[str]:
+    """
+    Genera `count` PINs distintos entre sí y que ningún usuario tiene asignado,
+    para que /unlock (que busca por PIN) no pueda abrir el locker de otro.
+    """
+    pins = set()
+    while len(pins) < count:
+        candidates = set()
+        while len(pins) + len(candidates) < count:
+            pin = generate_pin()
+            if pin not in pins:
+                candidates.add(pin)
+
+        taken = set()
+        for chunk in _chunks(list(candidates)):
+            taken.update(db.execute(
+                select(models.LockerUser.pin).where(models.LockerUser.pin.in_(chunk))
+            ).scalars().all())
+        pins.update(candidates - taken)
+    return list(pins)
+
+def batch_assign_lockers(db: Session, emails: List[str]) -> List[Dict]:
+    """
+    Asigna un locker disponible a cada email en una sola transacción.
+    Sin aplicar cambios, lanza LockersUnavailableError si no hay lockers
+    suficientes y UsersWithLockerError si algún email ya tiene un locker.
+    """
+    # Reservar los lockers; SKIP LOCKED salta los que ya reservó otro /use o lote
+    locker_ids = db.execute(
+        select(models.Locker.id)
+        .where(models.Locker.status == "disponible")
+        .order_by(models.Locker.id)
+        .limit(len(emails))
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if len(locker_ids) < len(emails):
+        db.rollback()
+        raise LockersUnavailableError()
+
+    # Crear los usuarios que aún no existen
+    for chunk in _chunks(emails):
+        db.execute(
+            pg_insert(models.LockerUser)
+            .values([{"email": email} for email in chunk])
+            .on_conflict_do_nothing(index_elements=["email"])
+        )
+
+    # Bloquear los usuarios para que otro lote no les asigne locker a la vez
+    user_ids = {}
+    for chunk in _chunks(emails):
+        rows = db.execute(
+            select(models.LockerUser.id, models.LockerUser.email)
+            .where(models.LockerUser.email.in_(chunk))
+            .with_for_update()
+        ).all()
+        user_ids.update({email: user_id for user_id, email in rows})
+
+    # Un usuario con locker perdería el acceso al primero si se le reasigna el PIN
+    emails_by_user = {user_id: email for email, user_id in user_ids.items()}
+    conflicting = []
+    for chunk in _chunks(list(emails_by_user)):
+        conflicting.extend(db.execute(
+            select(models.Locker.assigned_user_id)
+            .where(models.Locker.assigned_user_id.in_(chunk))
+        ).scalars().all())
+    if conflicting:
+        db.rollback()
+        raise UsersWithLockerError(sorted({emails_by_user[user_id] for user_id in conflicting}))
+
+    now = datetime.utcnow()
+    pins = generate_unique_pins(db, len(emails))
+    assignments = [
+        {
+            "locker_id": locker_id,
+            "user_id": user_ids[email],
+            "email": email,
+            "pin": pin,
+        }
+        for locker_id, email, pin in zip(locker_ids, emails, pins)
+    ]
+
+    # Actualizaciones con executemany sobre las tablas (Core) por bloques
+    users_table = models.LockerUser.__table__
+    lockers_table = models.Locker.__table__
+    update_pins = (
+        update(users_table)
+        .where(users_table.c.id == bindparam("b_user_id"))
+        .values(pin=bindparam("b_pin"), pin_created_at=now)
+    )
+    update_lockers = (
+        update(lockers_table)
+        .where(lockers_table.c.id == bindparam("b_locker_id"))
+        .values(assigned_user_id=bindparam("b_user_id"), status="ocupado", updated_at=now)
+    )
+    for chunk in _chunks(assignments):
+        db.execute(update_pins, [
+            {"b_user_id": a["user_id"], "b_pin": a["pin"]} for a in chunk
+        ])
+        db.execute(update_lockers, [
+            {"b_locker_id": a["locker_id"], "b_user_id": a["user_id"]} for a in chunk
+        ])
+
+    _bulk_create_history(db, locker_ids, "locker_asignado")
+    _bulk_create_history(db, locker_ids, "objeto_colocado")
+    db.commit()
+    return assignments
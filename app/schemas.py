@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Literal, Optional
 from datetime import datetime
+from app.core.config import settings
 
 # Schemas for LockerUser
 class LockerUserBase(BaseModel):
@@ -72,4 +73,33 @@ class LockerMovement(BaseModel):
 class LockerStatus(BaseModel):
     id: int
     status: str
-    updated_at: datetime
\ No newline at end of file
+    updated_at: datetime
+
+# Schemas para operaciones masivas
+LockerStatusValue = Literal["disponible", "esperando_objeto", "ocupado"]
+
+class LockerBulkCreateRow(BaseModel):
+    # Un locker recién creado no tiene usuario: solo puede estar disponible
+    status: Literal["disponible"] = "disponible"
+
+class LockerBulkSelection(BaseModel):
+    # Selección por lista de ids y/o por estado actual (se combinan con AND)
+    locker_ids: Optional[List[int]] = Field(None, max_length=settings.BULK_MAX_COUNT)
+    status: Optional[LockerStatusValue] = None
+
+class LockerBulkStatusChange(LockerBulkSelection):
+    # "disponible" no se admite: para liberar usar /lockers/bulk/release
+    new_status: Literal["esperando_objeto", "ocupado"]
+
+class BulkResult(BaseModel):
+    requested: int
+    affected: int
+    ids: List[int] = []
+
+class BatchCheckout(BaseModel):
+    emails: List[EmailStr] = Field(max_length=settings.BULK_MAX_COUNT)
+
+class CheckoutAssignment(BaseModel):
+    locker_id: int
+    user_id: int
+    email: EmailStr
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from typing import Any, Dict, List
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def parse_bulk_rows(body: bytes, content_type: str, key: str, column: str) -> List[Dict[str, Any]]:
+    """
+    Convierte el cuerpo de una carga masiva en una lista de filas (diccionarios).
+    - text/csv: primera línea con cabeceras; debe incluir la columna `column`
+    - application/x-ndjson: un objeto JSON por línea
+    - application/json: lista de objetos o un objeto con la lista bajo `key`
+    Lanza ValueError si el contenido no se puede interpretar.
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("El archivo debe estar codificado en UTF-8")
+
+    if media_type in CSV_CONTENT_TYPES:
+        reader = csv.DictReader(io.StringIO(text))
+        headers = [h.strip() for h in (reader.fieldnames or []) if h]
+        if column not in headers:
+            raise ValueError(f"El CSV debe tener una columna '{column}'")
+        rows = []
+        for row in reader:
+            # Ignorar celdas vacías para que se apliquen los valores por defecto
+            rows.append({
+                k.strip(): v.strip()
+                for k, v in row.items()
+                if k and v is not None and v.strip() != ""
+            })
+        return rows
+
+    if media_type in NDJSON_CONTENT_TYPES:
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                raise ValueError(f"JSON inválido en la línea {line_number}")
+        return rows
+
+    try:
+        data = json.loads(text) if text.strip() else []
+    except json.JSONDecodeError:
+        raise ValueError("JSON inválido en el cuerpo de la petición")
+    if isinstance(data, dict):
+        if key not in data:
+            raise ValueError(f"Falta la clave '{key}' en el cuerpo de la petición")
+        data = data[key]
+    if not isinstance(data, list):
+        raise ValueError(f"Se esperaba una lista de objetos en '{key}'")
+    return data
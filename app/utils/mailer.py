@@ -1,13 +1,46 @@
 import smtplib
 from email.mime.text import MIMEText
+from typing import List, Tuple
 from app.core.config import settings
 
-def send_pin_email(to_email: str, pin: str):
+def _build_pin_message(to_email: str, pin: str) -> MIMEText:
     msg = MIMEText(f"Tu PIN para abrir el locker es: {pin}")
     msg["Subject"] = "Código PIN para Locker"
     msg["From"] = settings.EMAIL_HOST_USER
     msg["To"] = to_email
+    return msg
+
+def send_pin_email(to_email: str, pin: str):
+    msg = _build_pin_message(to_email, pin)
 
     with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
         server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-        server.send_message(msg)
\ No newline at end of file
+        server.send_message(msg)
+
+def send_pin_emails(recipients: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Envía varios PIN (email, pin) reutilizando una sola conexión SMTP.
+    Devuelve la lista de (email, error) de los envíos que fallaron.
+    Si falla la conexión o el login no se envía ninguno y se lanza la excepción.
+    """
+    failures = []
+    server = smtplib.SMTP_SSL("smtp.gmail.com", 465)
+    try:
+        server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+        for index, (to_email, pin) in enumerate(recipients):
+            try:
+                server.send_message(_build_pin_message(to_email, pin))
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                    smtplib.SMTPDataError) as e:
+                # Rechazo de este mensaje: la conexión sigue siendo válida
+                failures.append((to_email, str(e)))
+            except OSError as e:
+                # Conexión perdida: este y los pendientes no se enviaron
+                failures.extend((email, str(e)) for email, _ in recipients[index:])
+                break
+    finally:
+        try:
+            server.quit()
+        except OSError:
+            server.close()
+    return failures
@@ -0,0 +1,130 @@
+import itertools
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app import crud
+
+
+class StubResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def scalars(self):
+        return self
+
+
+class StubSession:
+    """Sesión falsa: guarda las sentencias ejecutadas y devuelve resultados en orden"""
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.statements = []
+        self.committed = False
+        self.rolled_back = False
+
+    def execute(self, statement, params=None):
+        self.statements.append(statement)
+        return StubResult(self.results.pop(0) if self.results else [])
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        pass
+
+
+def compile_pg(statement):
+    return statement.compile(dialect=postgresql.dialect(),
+                             compile_kwargs={"literal_binds": True})
+
+
+def test_bulk_release_clears_pins_of_returned_users_only():
+    db = StubSession(results=[[(1, 10), (2, None), (3, 30)]])
+
+    released_ids = crud.bulk_release_lockers(db, status="ocupado")
+
+    assert released_ids == [1, 2, 3]
+    assert db.committed
+    release_sql = str(compile_pg(db.statements[0]))
+    assert release_sql.startswith("WITH targets AS")
+    assert "lockers.status != 'disponible'" in release_sql
+    assert "FOR UPDATE" in release_sql
+    assert "RETURNING lockers.id, targets.assigned_user_id" in release_sql
+
+    clear_sql = str(compile_pg(db.statements[1]))
+    assert clear_sql.startswith("UPDATE locker_users SET pin=NULL")
+    assert "locker_users.id IN (10, 30)" in clear_sql
+
+
+def test_bulk_release_without_matches_writes_nothing_else():
+    db = StubSession(results=[[]])
+
+    assert crud.bulk_release_lockers(db, locker_ids=[5]) == []
+    assert len(db.statements) == 1
+
+
+def test_bulk_status_change_only_touches_assigned_lockers():
+    db = StubSession(results=[[4, 5]])
+
+    updated_ids = crud.bulk_update_locker_status(db, "esperando_objeto", locker_ids=[4, 5, 6])
+
+    assert updated_ids == [4, 5]
+    sql = str(compile_pg(db.statements[0]))
+    assert "lockers.assigned_user_id IS NOT NULL" in sql
+    assert "lockers.id IN (4, 5, 6)" in sql
+
+
+def test_generate_unique_pins_redraws_collisions(monkeypatch):
+    draws = iter(["111111", "111111", "222222", "333333", "444444"])
+    monkeypatch.setattr(crud, "generate_pin", lambda: next(draws))
+    # "222222" ya lo tiene otro usuario en la base de datos
+    db = StubSession(results=[["222222"], []])
+
+    pins = crud.generate_unique_pins(db, 2)
+
+    assert sorted(pins) == ["111111", "333333"]
+    assert len(db.statements) == 2
+
+
+def test_generate_unique_pins_are_distinct(monkeypatch):
+    counter = itertools.count()
+    monkeypatch.setattr(crud, "generate_pin", lambda: f"{next(counter) // 2:06d}")
+
+    pins = crud.generate_unique_pins(StubSession(), 50)
+
+    assert len(set(pins)) == 50
+
+
+def test_batch_assign_without_enough_lockers_changes_nothing():
+    db = StubSession(results=[[1]])
+
+    with pytest.raises(crud.LockersUnavailableError):
+        crud.batch_assign_lockers(db, ["a@b.com", "c@d.com"])
+
+    assert db.rolled_back
+    assert not db.committed
+    assert len(db.statements) == 1
+    assert "SKIP LOCKED" in str(compile_pg(db.statements[0]))
+
+
+def test_batch_assign_rejects_users_with_locker():
+    db = StubSession(results=[
+        [1, 2],                            # lockers reservados
+        [],                                # INSERT de usuarios
+        [(10, "a@b.com"), (20, "c@d.com")],  # ids de usuario
+        [20],                              # usuarios con locker asignado
+    ])
+
+    with pytest.raises(crud.UsersWithLockerError) as exc_info:
+        crud.batch_assign_lockers(db, ["a@b.com", "c@d.com"])
+
+    assert exc_info.value.emails == ["c@d.com"]
+    assert db.rolled_back
+    assert not db.committed
@@ -0,0 +1,72 @@
+import pytest
+
+from app.utils.bulk_import import parse_bulk_rows
+
+
+def test_csv_rows_drop_empty_cells():
+    body = b"email,nombre\na@b.com,\nc@d.com,Ana\n"
+    rows = parse_bulk_rows(body, "text/csv; charset=utf-8", "users", "email")
+    assert rows == [{"email": "a@b.com"}, {"email": "c@d.com", "nombre": "Ana"}]
+
+
+def test_csv_strips_bom_and_whitespace():
+    body = "\ufeff status \n ocupado \n".encode("utf-8")
+    rows = parse_bulk_rows(body, "text/csv", "lockers", "status")
+    assert rows == [{"status": "ocupado"}]
+
+
+def test_csv_without_expected_column_is_rejected():
+    with pytest.raises(ValueError):
+        parse_bulk_rows(b"estado\nocupado\n", "text/csv", "lockers", "status")
+
+
+def test_empty_csv_is_rejected():
+    with pytest.raises(ValueError):
+        parse_bulk_rows(b"", "text/csv", "users", "email")
+
+
+def test_ndjson_skips_blank_lines():
+    body = b'{"status": "ocupado"}\n\n{}\n'
+    rows = parse_bulk_rows(body, "application/x-ndjson", "lockers", "status")
+    assert rows == [{"status": "ocupado"}, {}]
+
+
+def test_ndjson_reports_invalid_line():
+    body = b'{"email": "a@b.com"}\n{roto\n'
+    with pytest.raises(ValueError, match="línea 2"):
+        parse_bulk_rows(body, "application/x-ndjson", "users", "email")
+
+
+def test_json_list():
+    rows = parse_bulk_rows(b'[{"email": "a@b.com"}]', "application/json", "users", "email")
+    assert rows == [{"email": "a@b.com"}]
+
+
+def test_json_object_with_key():
+    body = b'{"lockers": [{}, {"status": "ocupado"}]}'
+    rows = parse_bulk_rows(body, "application/json", "lockers", "status")
+    assert rows == [{}, {"status": "ocupado"}]
+
+
+def test_empty_json_body_returns_no_rows():
+    assert parse_bulk_rows(b"", "application/json", "lockers", "status") == []
+
+
+def test_json_object_without_key_is_rejected():
+    with pytest.raises(ValueError, match="users"):
+        parse_bulk_rows(b'{"emails": ["a@b.com"]}', "application/json", "users", "email")
+
+
+def test_json_key_must_hold_a_list():
+    with pytest.raises(ValueError):
+        parse_bulk_rows(b'{"users": "a@b.com"}', "application/json", "users", "email")
+
+
+def test_invalid_json_is_rejected():
+    with pytest.raises(ValueError):
+        parse_bulk_rows(b"{", "application/json", "users", "email")
+
+
+def test_non_utf8_body_is_rejected():
+    with pytest.raises(ValueError):
+        parse_bulk_rows("email\ní@b.com\n".encode("latin-1"), "text/csv", "users", "email")
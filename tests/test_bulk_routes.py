@@ -0,0 +1,90 @@
+import smtplib
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app import crud, schemas
+from app.api import routes
+from app.api.routes import _require_selection
+
+
+class StubSession:
+    def close(self):
+        pass
+
+
+def test_empty_selection_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        _require_selection(schemas.LockerBulkSelection())
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize("selection", [
+    schemas.LockerBulkSelection(locker_ids=[1, 2]),
+    schemas.LockerBulkSelection(locker_ids=[]),
+    schemas.LockerBulkSelection(status="ocupado"),
+])
+def test_selection_with_ids_or_status_is_accepted(selection):
+    _require_selection(selection)
+
+
+def test_status_change_rejects_disponible():
+    with pytest.raises(ValidationError):
+        schemas.LockerBulkStatusChange(locker_ids=[1], new_status="disponible")
+
+
+def test_selection_rejects_unknown_status():
+    with pytest.raises(ValidationError):
+        schemas.LockerBulkSelection(status="roto")
+
+
+@pytest.mark.parametrize("status", ["ocupado", "esperando_objeto", "roto"])
+def test_bulk_create_row_only_accepts_disponible(status):
+    with pytest.raises(ValidationError):
+        schemas.LockerBulkCreateRow(status=status)
+
+
+def test_batch_checkout_is_capped():
+    emails = [f"u{i}@b.com" for i in range(routes.settings.BULK_MAX_COUNT + 1)]
+    with pytest.raises(ValidationError):
+        schemas.BatchCheckout(emails=emails)
+
+
+def test_selection_ids_are_capped():
+    with pytest.raises(ValidationError):
+        schemas.LockerBulkSelection(locker_ids=list(range(routes.settings.BULK_MAX_COUNT + 1)))
+
+def test_send_batch_pin_emails_creates_alerts_for_failures(monkeypatch):
+    alerts = []
+    monkeypatch.setattr(routes, "send_pin_emails",
+                        lambda recipients: [("c@d.com", "rechazado")])
+    monkeypatch.setattr(routes, "SessionLocal", StubSession)
+    monkeypatch.setattr(crud, "create_locker_alert",
+                        lambda db, locker_id, description: alerts.append((locker_id, description)))
+
+    routes._send_batch_pin_emails([
+        {"locker_id": 1, "user_id": 10, "email": "a@b.com", "pin": "111111"},
+        {"locker_id": 2, "user_id": 20, "email": "c@d.com", "pin": "222222"},
+    ])
+
+    assert alerts == [(2, "Error al enviar PIN a c@d.com: rechazado")]
+
+
+def test_send_batch_pin_emails_login_failure_alerts_every_locker(monkeypatch):
+    alerts = []
+
+    def fail(recipients):
+        raise smtplib.SMTPAuthenticationError(535, b"bad credentials")
+
+    monkeypatch.setattr(routes, "send_pin_emails", fail)
+    monkeypatch.setattr(routes, "SessionLocal", StubSession)
+    monkeypatch.setattr(crud, "create_locker_alert",
+                        lambda db, locker_id, description: alerts.append(locker_id))
+
+    routes._send_batch_pin_emails([
+        {"locker_id": 1, "user_id": 10, "email": "a@b.com", "pin": "111111"},
+        {"locker_id": 2, "user_id": 20, "email": "c@d.com", "pin": "222222"},
+    ])
+
+    assert alerts == [1, 2]
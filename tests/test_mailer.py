@@ -0,0 +1,45 @@
+import smtplib
+
+from app.utils import mailer
+
+
+class FakeSMTP:
+    def __init__(self, *args, fail_on=None, error=None):
+        self.fail_on = fail_on
+        self.error = error
+        self.sent = []
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        if msg["To"] == self.fail_on:
+            raise self.error
+        self.sent.append(msg["To"])
+
+    def quit(self):
+        raise ConnectionResetError()
+
+    def close(self):
+        pass
+
+
+def test_send_pin_emails_lost_connection_fails_only_pending(monkeypatch):
+    server = FakeSMTP(fail_on="b@b.com", error=ConnectionResetError("reset"))
+    monkeypatch.setattr(mailer.smtplib, "SMTP_SSL", lambda *args: server)
+
+    failures = mailer.send_pin_emails([("a@b.com", "1"), ("b@b.com", "2"), ("c@b.com", "3")])
+
+    assert server.sent == ["a@b.com"]
+    assert [email for email, _ in failures] == ["b@b.com", "c@b.com"]
+
+
+def test_send_pin_emails_refused_recipient_keeps_sending(monkeypatch):
+    error = smtplib.SMTPRecipientsRefused({"b@b.com": (550, b"no existe")})
+    server = FakeSMTP(fail_on="b@b.com", error=error)
+    monkeypatch.setattr(mailer.smtplib, "SMTP_SSL", lambda *args: server)
+
+    failures = mailer.send_pin_emails([("a@b.com", "1"), ("b@b.com", "2"), ("c@b.com", "3")])
+
+    assert server.sent == ["a@b.com", "c@b.com"]
+    assert [email for email, _ in failures] == ["b@b.com"]